@@ -14,6 +14,16 @@ class Settings(BaseSettings):
     max_file_size: int = 10485760  # 10MB in bytes
     allowed_extensions: str = "jpg,jpeg,png,gif,webp"
     
+    # Storage Configuration
+    storage_backend: str = "local"  # local or s3
+    storage_shard_depth: int = 2  # ab/cd/<hash>.<ext>
+    storage_index_file: str = ".storage_index.sqlite3"
+    s3_endpoint_url: str = ""  # e.g. http://localhost:9000 for MinIO
+    s3_bucket: str = "images"
+    s3_access_key: str = ""
+    s3_secret_key: str = ""
+    s3_region: str = "us-east-1"
+    
     # CORS Configuration
     cors_origins: str = "http://localhost:5173,http://localhost:3000"
     
@@ -21,7 +31,48 @@ class Settings(BaseSettings):
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
     qdrant_collection: str = "image_embeddings"
+
+    # Quantization Configuration
+    qdrant_quantization: str = "none"  # none, scalar or binary
+    qdrant_quantization_always_ram: bool = True
+    qdrant_vectors_on_disk: bool = False  # keep full-precision vectors on disk
+
+    # Search Configuration
+    search_default_limit: int = 10
+    search_oversampling: float = 2.0
+    search_rescore: bool = True
+    batch_search_max_queries: int = 256
+    batch_search_chunk_size: int = 32  # queries per forward pass and Qdrant batch request
+    
+    # Near-Duplicate Job Configuration
+    duplicate_threshold: float = 0.95  # minimum cosine similarity
+    duplicate_neighbors: int = 10
+    duplicate_block_size: int = 4096
+    duplicate_page_size: int = 1024
+    duplicate_write_batch: int = 256
+    
+    # Export/Import Configuration
+    transfer_batch_size: int = 512
+    transfer_parallel: int = 4
+    
+    # Admission Control Configuration
+    admission_max_inflight_decode_bytes: int = 536870912  # 512MB of decoded pixels
+    admission_max_inference_queue: int = 16  # embedding forward passes in flight
+    admission_max_memory_mb: int = 0  # 0 disables the memory check
+    admission_max_waiting: int = 64  # requests queued for capacity before shedding
+    admission_queue_timeout: float = 10.0  # seconds to wait for capacity
+    admission_retry_after: int = 5  # Retry-After seconds for shed requests
     
+    # Rate Limit Configuration
+    rate_limit_per_second: float = 5.0  # 0 disables rate limiting
+    rate_limit_burst: int = 32  # larger requests put the bucket into debt
+    rate_limit_client_header: str = ""  # e.g. X-Forwarded-For behind a reverse proxy
+    rate_limit_trusted_proxies: int = 1  # proxies in front of the API that append to the header
+    
+    # Facet Configuration
+    facet_min_width_buckets: str = "640,1280,1920,3840"
+    facet_duplicate_group_limit: int = 100  # largest groups first
+
     # Embedding Model Configuration
     embedding_model: str = "google/siglip-base-patch16-224"
     
@@ -41,6 +92,16 @@ class Settings(BaseSettings):
         """Get list of allowed file extensions"""
         return [ext.strip().lower() for ext in self.allowed_extensions.split(",")]
     
+    def max_request_size(self, files: int = 1) -> int:
+        """Largest accepted request body carrying up to `files` images, in bytes"""
+        # Headroom for multipart headers and form fields
+        return self.max_file_size * files + 1024 * 1024
+    
+    @property
+    def facet_min_width_buckets_list(self) -> list[int]:
+        """Get list of minimum width thresholds for resolution facets"""
+        return [int(width.strip()) for width in self.facet_min_width_buckets.split(",")]
+    
     @property
     def cors_origins_list(self) -> list[str]:
         """Get list of CORS origins"""
@@ -1,5 +1,6 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
 import sys
 
@@ -7,6 +8,8 @@ from app.config.settings import settings
 from app.routers import images
 from app.services.embedding_service import embedding_service
 from app.services.qdrant_service import qdrant_service
+from app.services.storage_service import storage_service
+from app.services.admission_service import admission_controller, rate_limiter
 
 # Configure logging
 logging.basicConfig(
@@ -24,22 +27,27 @@ def initialize_services():
         logger.info("=" * 60)
         
         # 1. Load embedding model
-        logger.info("Step 1/3: Loading SigLIP embedding model...")
+        logger.info("Step 1/4: Loading SigLIP embedding model...")
         embedding_service.load_model()
         logger.info("✓ Embedding model loaded successfully")
         
         # 2. Connect to Qdrant
-        logger.info("Step 2/3: Connecting to Qdrant...")
+        logger.info("Step 2/4: Connecting to Qdrant...")
         qdrant_service.connect(max_retries=3, retry_delay=5)
         logger.info("✓ Connected to Qdrant successfully")
         
         # 3. Create collection
-        logger.info("Step 3/3: Setting up Qdrant collection...")
+        logger.info("Step 3/4: Setting up Qdrant collection...")
         qdrant_service.create_collection(
             vector_size=embedding_service.get_embedding_dimension()
         )
         logger.info("✓ Qdrant collection ready")
         
+        # 4. Open image storage
+        logger.info(f"Step 4/4: Opening {settings.storage_backend} image storage...")
+        storage_service.initialize()
+        logger.info("✓ Image storage ready")
+        
         logger.info("=" * 60)
         logger.info("✓ All services initialized successfully")
         logger.info("=" * 60)
@@ -58,7 +66,56 @@ app = FastAPI(
     description="API for uploading and managing images with vector embeddings"
 )
 
-# Configure CORS
+# Endpoints that decode images or run inference, with the most images a
+# request to each may carry
+ADMITTED_PATHS = {
+    f"/api/{settings.api_version}/images/{endpoint}": max_files
+    for endpoint, max_files in (
+        ("upload", 1),
+        ("search", 1),
+        ("upload-multiple", settings.batch_search_max_queries),
+        ("search-batch", settings.batch_search_max_queries),
+    )
+}
+
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    """
+    Shed uploads and searches before their multipart body is read
+    
+    Bodies larger than the endpoint's image limit allows are rejected from
+    Content-Length, a full wait queue sheds with 503, and the client is
+    charged at least one rate limit token per `max_file_size` bytes of
+    body. Handlers charge the rest once the actual number of images and
+    queries is known.
+    """
+    max_files = ADMITTED_PATHS.get(request.url.path)
+    if request.method != "POST" or max_files is None:
+        return await call_next(request)
+    
+    max_size = settings.max_request_size(max_files)
+    
+    try:
+        content_length = int(request.headers.get("content-length", 0))
+    except ValueError:
+        content_length = 0
+    
+    try:
+        if content_length > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request body exceeds maximum size of {max_size / 1024 / 1024:.0f}MB"
+            )
+        
+        admission_controller.check()
+        rate_limiter.check(request, cost=max(1, content_length // settings.max_file_size))
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
+    
+    return await call_next(request)
+
+# Configure CORS (added last so it also wraps shed responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -98,5 +155,7 @@ def health_check():
     return {
         "status": "healthy" if (qdrant_healthy and model_loaded) else "degraded",
         "qdrant": "connected" if qdrant_healthy else "disconnected",
-        "embedding_model": "loaded" if model_loaded else "not loaded"
+        "embedding_model": "loaded" if model_loaded else "not loaded",
+        "admission": admission_controller.snapshot(),
+        "rate_limit": rate_limiter.snapshot()
     }
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 
 class ImageResponse(BaseModel):
@@ -10,12 +11,65 @@ class ImageResponse(BaseModel):
     size: int
     type: str
     uploaded_at: str
+    duplicate_group: Optional[str] = None
 
 
 class ImageListResponse(BaseModel):
     """Response model for list of images"""
     images: list[ImageResponse]
     total: int
+    next_cursor: Optional[str] = None
+
+
+class SearchResult(BaseModel):
+    """Response model for a single search hit"""
+    image: ImageResponse
+    score: float
+
+
+class SearchResponse(BaseModel):
+    """Response model for similarity search results"""
+    results: list[SearchResult]
+    total: int
+
+
+class BatchSearchResult(BaseModel):
+    """One NDJSON line of a batch search response"""
+    index: int
+    query: str
+    results: list[SearchResult] = []
+    error: Optional[str] = None
+
+
+class ImageFilter(BaseModel):
+    """Filters over indexed image metadata"""
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+    min_width: Optional[int] = None
+    min_height: Optional[int] = None
+    min_file_size: Optional[int] = None
+    max_file_size: Optional[int] = None
+    mime_types: Optional[list[str]] = None
+    duplicate_group: Optional[str] = None
+    has_duplicates: Optional[bool] = None
+    
+    def is_empty(self) -> bool:
+        """Check whether no filter is set"""
+        return all(value in (None, []) for value in self.model_dump().values())
+
+
+class FacetValue(BaseModel):
+    """Number of images with a given field value"""
+    value: str
+    count: int
+
+
+class FacetResponse(BaseModel):
+    """Response model for facet counts"""
+    mime_type: list[FacetValue]
+    min_width: list[FacetValue]
+    duplicate_group: list[FacetValue]
+    total: int
 
 
 class ErrorResponse(BaseModel):
@@ -1,15 +1,53 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Depends, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from datetime import datetime
+from pathlib import Path
+import mimetypes
+import tempfile
+from typing import List, Optional
 
 from app.services.image_service import ImageService
-from app.models.image import ImageResponse, ImageListResponse, ErrorResponse
+from app.models.image import (
+    ImageResponse,
+    ImageListResponse,
+    SearchResponse,
+    ImageFilter,
+    FacetResponse,
+    ErrorResponse,
+)
+from app.services.storage_service import storage_service
+from app.services.admission_service import rate_limiter
 from app.config.settings import settings
 
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 
+def image_filter_params(
+    uploaded_after: Optional[datetime] = Query(None, description="Uploaded at or after this time (UTC unless an offset is given)"),
+    uploaded_before: Optional[datetime] = Query(None, description="Uploaded at or before this time (UTC unless an offset is given)"),
+    min_width: Optional[int] = Query(None, ge=1, description="Minimum width in pixels"),
+    min_height: Optional[int] = Query(None, ge=1, description="Minimum height in pixels"),
+    min_file_size: Optional[int] = Query(None, ge=0, description="Minimum file size in bytes"),
+    max_file_size: Optional[int] = Query(None, ge=0, description="Maximum file size in bytes"),
+    mime_type: Optional[List[str]] = Query(None, description="Allowed mime types"),
+    duplicate_group: Optional[str] = Query(None, description="Near-duplicate group id"),
+    has_duplicates: Optional[bool] = Query(None, description="Only images in (true) or outside (false) a near-duplicate group")
+) -> ImageFilter:
+    """Collect image metadata filters from query parameters"""
+    return ImageFilter(
+        uploaded_after=uploaded_after,
+        uploaded_before=uploaded_before,
+        min_width=min_width,
+        min_height=min_height,
+        min_file_size=min_file_size,
+        max_file_size=max_file_size,
+        mime_types=mime_type,
+        duplicate_group=duplicate_group,
+        has_duplicates=has_duplicates
+    )
+
+
 @router.post(
     "/upload",
     response_model=ImageResponse,
@@ -17,6 +55,8 @@ router = APIRouter(prefix="/images", tags=["images"])
     responses={
         400: {"model": ErrorResponse, "description": "Invalid file"},
         409: {"model": ErrorResponse, "description": "File already exists"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "Server busy"},
     }
 )
 async def upload_image(file: UploadFile = File(...)):
@@ -31,10 +71,15 @@ async def upload_image(file: UploadFile = File(...)):
     responses={
         400: {"model": ErrorResponse, "description": "Invalid file"},
         409: {"model": ErrorResponse, "description": "File already exists"},
+        413: {"model": ErrorResponse, "description": "Request body too large"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "Server busy"},
     }
 )
-async def upload_multiple_images(files: List[UploadFile] = File(...)):
+async def upload_multiple_images(request: Request, files: List[UploadFile] = File(...)):
     """Upload multiple images"""
+    rate_limiter.check(request, cost=len(files))
+    
     uploaded_images = []
     errors = []
     
@@ -43,6 +88,9 @@ async def upload_multiple_images(files: List[UploadFile] = File(...)):
             image = await ImageService.save_image(file)
             uploaded_images.append(image)
         except HTTPException as e:
+            # Surface shedding with its Retry-After if nothing got through
+            if e.status_code == 503 and not uploaded_images:
+                raise
             errors.append({"filename": file.filename, "error": e.detail})
     
     if errors and not uploaded_images:
@@ -51,6 +99,78 @@ async def upload_multiple_images(files: List[UploadFile] = File(...)):
     return uploaded_images
 
 
+@router.post(
+    "/search",
+    response_model=SearchResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid file"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "Search backend unavailable or server busy"},
+    }
+)
+async def search_images(
+    file: UploadFile = File(...),
+    limit: int = Query(settings.search_default_limit, ge=1, le=100),
+    oversampling: Optional[float] = Query(None, ge=1.0, le=16.0),
+    rescore: Optional[bool] = Query(None),
+    image_filter: ImageFilter = Depends(image_filter_params)
+):
+    """Search for images similar to the uploaded image, optionally filtered by metadata"""
+    results = await ImageService.search_similar(file, limit, oversampling, rescore, image_filter)
+    return SearchResponse(results=results, total=len(results))
+
+
+@router.post(
+    "/search-batch",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One JSON line per query, in query order"
+        },
+        400: {"model": ErrorResponse, "description": "No queries or too many queries"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "Server busy"},
+    }
+)
+async def search_images_batch(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(None),
+    texts: Optional[List[str]] = Form(None),
+    limit: int = Query(settings.search_default_limit, ge=1, le=100),
+    oversampling: Optional[float] = Query(None, ge=1.0, le=16.0),
+    rescore: Optional[bool] = Query(None),
+    image_filter: ImageFilter = Depends(image_filter_params)
+):
+    """Search for images similar to each of many query images and texts"""
+    files = files or []
+    texts = texts or []
+    total = len(files) + len(texts)
+    
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one query image or text")
+    
+    if total > settings.batch_search_max_queries:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many queries ({total}), maximum is {settings.batch_search_max_queries}"
+        )
+    
+    rate_limiter.check(request, cost=total)
+    
+    spool = tempfile.TemporaryDirectory(prefix="batch-search-")
+    try:
+        queries = await ImageService.read_batch_queries(files, texts, Path(spool.name))
+    except Exception:
+        spool.cleanup()
+        raise
+    
+    return StreamingResponse(
+        ImageService.stream_batch_search(queries, spool, limit, oversampling, rescore, image_filter),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get(
     "",
     response_model=ImageListResponse,
@@ -58,10 +178,29 @@ async def upload_multiple_images(files: List[UploadFile] = File(...)):
         200: {"description": "List of all images"}
     }
 )
-def get_images():
-    """Get list of all uploaded images"""
-    images = ImageService.get_all_images()
-    return ImageListResponse(images=images, total=len(images))
+def get_images(
+    image_filter: ImageFilter = Depends(image_filter_params),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum images per page when filtering"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page when filtering")
+):
+    """Get list of all uploaded images, optionally filtered by metadata"""
+    if image_filter.is_empty():
+        images = ImageService.get_all_images()
+        return ImageListResponse(images=images, total=len(images))
+    
+    return ImageService.get_filtered_images(image_filter, limit, cursor)
+
+
+@router.get(
+    "/facets",
+    response_model=FacetResponse,
+    responses={
+        503: {"model": ErrorResponse, "description": "Search backend unavailable"},
+    }
+)
+def get_facets(image_filter: ImageFilter = Depends(image_filter_params)):
+    """Count images per mime type, minimum width and near-duplicate group, optionally filtered by metadata"""
+    return ImageService.get_facets(image_filter)
 
 
 @router.get(
@@ -73,23 +212,24 @@ def get_images():
 )
 def get_image(filename: str):
     """Get a specific image file"""
-    file_path = settings.upload_path / filename
+    stored = storage_service.get(filename)
     
-    if not file_path.exists():
+    if stored is None:
         raise HTTPException(status_code=404, detail=f"Image '{filename}' not found")
     
     # Determine media type from file extension
-    import mimetypes
     media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Cache-Control": "public, max-age=3600",
+        "ETag": f'"{stored.content_hash}"'
+    }
     
-    return FileResponse(
-        file_path,
-        media_type=media_type,
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Cache-Control": "public, max-age=3600"
-        }
-    )
+    file_path = storage_service.local_path(stored)
+    if file_path is not None:
+        return FileResponse(file_path, media_type=media_type, headers=headers)
+    
+    return StreamingResponse(storage_service.open(stored), media_type=media_type, headers=headers)
 
 
 @router.delete(
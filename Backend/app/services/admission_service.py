@@ -0,0 +1,259 @@
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import math
+import os
+import threading
+import time
+import logging
+
+from fastapi import HTTPException, Request
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB, or None if unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdmissionController:
+    """
+    Admit decode and inference work only while the node has capacity
+
+    Tracks decoded-image bytes and embedding forward passes in flight, plus
+    process memory. Work that does not fit waits up to
+    `admission_queue_timeout` seconds and is then shed with 503.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inflight_decode_bytes = 0
+        self.inflight_inference = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _fits(self, decode_bytes: int, inference: int) -> bool:
+        """Check whether new work fits within the limits (lock held)"""
+        max_memory = settings.admission_max_memory_mb
+        if max_memory > 0:
+            rss = current_rss_mb()
+            if rss is not None and rss >= max_memory:
+                return False
+
+        # A single oversized request is still admitted when nothing else runs
+        if self.inflight_decode_bytes and \
+                self.inflight_decode_bytes + decode_bytes > settings.admission_max_inflight_decode_bytes:
+            return False
+
+        return self.inflight_inference + inference <= settings.admission_max_inference_queue
+
+    def _try_acquire(self, decode_bytes: int, inference: int) -> bool:
+        with self._lock:
+            if not self._fits(decode_bytes, inference):
+                return False
+            self.inflight_decode_bytes += decode_bytes
+            self.inflight_inference += inference
+            return True
+
+    def _start_waiting(self) -> None:
+        with self._lock:
+            if self.waiting >= settings.admission_max_waiting:
+                self.rejected += 1
+                raise self._overloaded()
+            self.waiting += 1
+
+    def _stop_waiting(self, admitted: bool) -> None:
+        with self._lock:
+            self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+
+    @staticmethod
+    def _overloaded() -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry later",
+            headers={"Retry-After": str(settings.admission_retry_after)}
+        )
+
+    def release(self, decode_bytes: int, inference: int = 1) -> None:
+        """Return capacity taken by acquire()"""
+        with self._lock:
+            self.inflight_decode_bytes -= decode_bytes
+            self.inflight_inference -= inference
+
+    async def acquire(self, decode_bytes: int, inference: int = 1) -> None:
+        """
+        Wait for capacity without blocking the event loop
+
+        Raises:
+            HTTPException: 503 with Retry-After when capacity does not free up in time
+        """
+        if self._try_acquire(decode_bytes, inference):
+            return
+
+        self._start_waiting()
+        deadline = time.monotonic() + settings.admission_queue_timeout
+        admitted = False
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(POLL_INTERVAL)
+                if self._try_acquire(decode_bytes, inference):
+                    admitted = True
+                    return
+        finally:
+            self._stop_waiting(admitted)
+
+        raise self._overloaded()
+
+    @asynccontextmanager
+    async def admit(self, decode_bytes: int, inference: int = 1):
+        """Hold capacity for the duration of an async block"""
+        await self.acquire(decode_bytes, inference)
+        try:
+            yield
+        finally:
+            self.release(decode_bytes, inference)
+
+    def check(self) -> None:
+        """
+        Shed new requests early while the wait queue is full
+
+        Raises:
+            HTTPException: 503 with Retry-After
+        """
+        with self._lock:
+            if self.waiting >= settings.admission_max_waiting:
+                self.rejected += 1
+                raise self._overloaded()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current admission state for the health endpoint"""
+        with self._lock:
+            return {
+                "inflight_decode_bytes": self.inflight_decode_bytes,
+                "max_inflight_decode_bytes": settings.admission_max_inflight_decode_bytes,
+                "inflight_inference": self.inflight_inference,
+                "max_inference_queue": settings.admission_max_inference_queue,
+                "waiting": self.waiting,
+                "max_waiting": settings.admission_max_waiting,
+                "rejected": self.rejected,
+                "memory_mb": current_rss_mb(),
+                "max_memory_mb": settings.admission_max_memory_mb or None,
+            }
+
+
+class RateLimiter:
+    """Token bucket rate limiting per client"""
+
+    # Idle buckets are dropped once the table grows past this size
+    MAX_TRACKED_CLIENTS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.rejected = 0
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        """
+        Identify the client from the configured header or the peer address
+
+        Proxies append the address they received the request from, so only
+        the last `rate_limit_trusted_proxies` entries of the header can be
+        trusted; anything further left is supplied by the client.
+        """
+        header = settings.rate_limit_client_header
+        if header:
+            values = [
+                value.strip()
+                for line in request.headers.getlist(header)
+                for value in line.split(",")
+                if value.strip()
+            ]
+            hops = max(1, settings.rate_limit_trusted_proxies)
+            if len(values) >= hops:
+                return values[-hops]
+        return request.client.host if request.client else "unknown"
+
+    def check(self, request: Request, cost: int = 1) -> None:
+        """
+        Take `cost` tokens from the client's bucket
+
+        A request is admitted once the bucket holds `min(cost, burst)`
+        tokens. Larger requests put the bucket into debt, so the client's
+        next requests wait for the refill instead of being refused outright.
+        Tokens already taken for this request, e.g. by the middleware before
+        the body was read, count towards `cost`, and the remainder is
+        charged without a second admission check.
+
+        Raises:
+            HTTPException: 429 with Retry-After when the bucket is short
+        """
+        rate = settings.rate_limit_per_second
+        burst = settings.rate_limit_burst
+        if rate <= 0:
+            return
+
+        paid = getattr(request.state, "rate_limit_paid", 0)
+        remaining = cost - paid
+        if remaining <= 0:
+            return
+
+        client = self.client_key(request)
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+
+            required = 0 if paid else min(remaining, burst)
+            if tokens < required:
+                self._buckets[client] = (tokens, now)
+                self.rejected += 1
+                retry_after = math.ceil((required - tokens) / rate)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Rate limit exceeded",
+                    headers={"Retry-After": str(retry_after)}
+                )
+
+            self._buckets[client] = (tokens - remaining, now)
+            request.state.rate_limit_paid = cost
+
+            if len(self._buckets) > self.MAX_TRACKED_CLIENTS:
+                self._prune(now, rate, burst)
+
+    def _prune(self, now: float, rate: float, burst: int) -> None:
+        """Drop buckets that have refilled completely (lock held)"""
+        self._buckets = {
+            client: (tokens, updated)
+            for client, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * rate < burst
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current rate limiter state for the health endpoint"""
+        with self._lock:
+            return {
+                "enabled": settings.rate_limit_per_second > 0,
+                "per_second": settings.rate_limit_per_second,
+                "burst": settings.rate_limit_burst,
+                "tracked_clients": len(self._buckets),
+                "rejected": self.rejected,
+            }
+
+
+# Global instances
+admission_controller = AdmissionController()
+rate_limiter = RateLimiter()
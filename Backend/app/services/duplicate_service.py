@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import tempfile
+import time
+import uuid
+import logging
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DuplicateReport:
+    """Summary of a near-duplicate job run"""
+    run_id: str
+    points: int
+    groups: int
+    duplicates: int
+    elapsed: float
+
+
+class DuplicateService:
+    """
+    Find near-duplicate image groups across the whole collection
+
+    Vectors are spilled page by page from Qdrant into a memory-mapped file,
+    so only one scroll page and one pair of blocks are held in memory. k-NN
+    is computed with blocked matrix multiplication and neighbours above the
+    similarity threshold are merged into connected components.
+    """
+
+    def find_groups(
+        self,
+        threshold: Optional[float] = None,
+        k: Optional[int] = None,
+        block_size: Optional[int] = None,
+        page_size: Optional[int] = None,
+        work_dir: Optional[Path] = None
+    ) -> DuplicateReport:
+        """
+        Compute near-duplicate groups and store them in point payloads
+
+        Args:
+            threshold: Minimum cosine similarity for two images to be linked
+            k: Number of nearest neighbours considered per image
+            block_size: Rows per block in the similarity matrix multiplication
+            page_size: Points per Qdrant scroll page
+            work_dir: Directory for the temporary vector file
+
+        Returns:
+            Summary of the run
+        """
+        threshold = settings.duplicate_threshold if threshold is None else threshold
+        k = settings.duplicate_neighbors if k is None else k
+        block_size = block_size or settings.duplicate_block_size
+        page_size = page_size or settings.duplicate_page_size
+
+        start = time.perf_counter()
+        run_id = uuid.uuid4().hex
+
+        with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+            vectors, ids = self._spill_vectors(Path(tmp), page_size)
+            count = len(ids)
+            logger.info(f"Spilled {count} vectors to disk")
+
+            parent = np.arange(count, dtype=np.int64)
+            for rows, neighbours in self._neighbours(vectors, threshold, k, block_size):
+                for row, neighbour in zip(rows, neighbours):
+                    self._union(parent, row, neighbour)
+
+            roots = self._resolve_roots(parent)
+            groups, duplicates = self._write_groups(roots, ids, run_id)
+
+            del vectors, ids
+
+        qdrant_service.clear_stale_duplicate_groups(run_id)
+
+        report = DuplicateReport(
+            run_id=run_id,
+            points=count,
+            groups=groups,
+            duplicates=duplicates,
+            elapsed=time.perf_counter() - start
+        )
+        logger.info(f"Found {report.groups} duplicate groups covering {report.duplicates} images")
+        return report
+
+    def _spill_vectors(self, tmp: Path, page_size: int) -> tuple[np.memmap, np.memmap]:
+        """Stream vectors and point ids from Qdrant into memory-mapped files"""
+        vector_path = tmp / "vectors.f32"
+        id_path = tmp / "ids.u8"
+        count = 0
+        dimension = None
+
+        with open(vector_path, "wb") as vector_file, open(id_path, "wb") as id_file:
+            for page in qdrant_service.iter_points(page_size=page_size, with_vectors=True):
+                block = np.asarray([point.vector for point in page], dtype=np.float32)
+                dimension = block.shape[1]
+
+                # Normalise so dot products are cosine similarities
+                norms = np.linalg.norm(block, axis=1, keepdims=True)
+                block /= np.maximum(norms, 1e-12)
+
+                vector_file.write(block.tobytes())
+                id_file.write(b"".join(uuid.UUID(str(point.id)).bytes for point in page))
+                count += len(page)
+
+        if count == 0:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros((0, 16), dtype=np.uint8)
+
+        vectors = np.memmap(vector_path, dtype=np.float32, mode="r", shape=(count, dimension))
+        ids = np.memmap(id_path, dtype=np.uint8, mode="r", shape=(count, 16))
+        return vectors, ids
+
+    def _neighbours(self, vectors: np.ndarray, threshold: float, k: int, block_size: int):
+        """
+        Yield (row, neighbour) index pairs of k-NN links above the threshold
+
+        Each row block is multiplied against every column block. Every
+        similarity block is first reduced to its own top k, which is then
+        merged with the running top k per row, so the merge only touches
+        block_size * 2k values. Peak memory is about block_size^2 * 12
+        bytes: the float32 similarity block plus the int64 argpartition
+        indices.
+        """
+        count = len(vectors)
+        k = min(k, max(count - 1, 0))
+        if k == 0:
+            return
+
+        for row_start in range(0, count, block_size):
+            queries = np.asarray(vectors[row_start:row_start + block_size])
+            rows = len(queries)
+            top_scores = np.full((rows, k), -np.inf, dtype=np.float32)
+            top_index = np.full((rows, k), -1, dtype=np.int64)
+
+            for col_start in range(0, count, block_size):
+                scores = queries @ np.asarray(vectors[col_start:col_start + block_size]).T
+
+                # Exclude each point from its own neighbours
+                if col_start == row_start:
+                    np.fill_diagonal(scores, -np.inf)
+
+                # Reduce the block to its top k before merging
+                columns = scores.shape[1]
+                if columns > k:
+                    block_best = np.argpartition(scores, columns - k, axis=1)[:, columns - k:]
+                    block_scores = np.take_along_axis(scores, block_best, axis=1)
+                else:
+                    block_best = np.broadcast_to(np.arange(columns, dtype=np.int64), scores.shape)
+                    block_scores = scores
+                del scores
+
+                merged_scores = np.concatenate([top_scores, block_scores], axis=1)
+                merged_index = np.concatenate([top_index, block_best + col_start], axis=1)
+
+                width = merged_scores.shape[1]
+                best = np.argpartition(merged_scores, width - k, axis=1)[:, width - k:]
+                top_scores = np.take_along_axis(merged_scores, best, axis=1)
+                top_index = np.take_along_axis(merged_index, best, axis=1)
+
+            linked_rows, linked_cols = np.nonzero(top_scores >= threshold)
+            yield linked_rows + row_start, top_index[linked_rows, linked_cols]
+
+    @staticmethod
+    def _find(parent: np.ndarray, node: int) -> int:
+        """Find the component root of a node with path halving"""
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, parent: np.ndarray, a: int, b: int) -> None:
+        """Merge the components of two nodes"""
+        root_a = self._find(parent, a)
+        root_b = self._find(parent, b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    @staticmethod
+    def _resolve_roots(parent: np.ndarray) -> np.ndarray:
+        """Point every node directly at its component root"""
+        roots = parent.copy()
+        while True:
+            next_roots = roots[roots]
+            if np.array_equal(next_roots, roots):
+                return roots
+            roots = next_roots
+
+    def _write_groups(self, roots: np.ndarray, ids: np.ndarray, run_id: str) -> tuple[int, int]:
+        """Store groups with more than one member in Qdrant, batch by batch"""
+        unique_roots, sizes = np.unique(roots, return_counts=True)
+        group_roots = unique_roots[sizes > 1]
+        if len(group_roots) == 0:
+            return 0, 0
+
+        members = np.nonzero(np.isin(roots, group_roots))[0]
+        members = members[np.argsort(roots[members], kind="stable")]
+        boundaries = np.nonzero(np.diff(roots[members]))[0] + 1
+
+        batch = []
+        for group in np.split(members, boundaries):
+            point_ids = [str(uuid.UUID(bytes=bytes(ids[index]))) for index in group]
+            # The lowest-index member is the root and names the group
+            batch.append((point_ids[0], point_ids))
+
+            if len(batch) >= settings.duplicate_write_batch:
+                qdrant_service.set_duplicate_groups(batch, run_id)
+                batch = []
+
+        if batch:
+            qdrant_service.set_duplicate_groups(batch, run_id)
+
+        return len(group_roots), len(members)
+
+
+# Global instance
+duplicate_service = DuplicateService()
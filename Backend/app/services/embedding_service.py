@@ -43,28 +43,71 @@ class EmbeddingService:
         Returns:
             List of floats representing the embedding vector
         """
+        return self.generate_embeddings([image])[0]
+    
+    def generate_embeddings(self, images: List[Image.Image]) -> List[List[float]]:
+        """
+        Generate embedding vectors for a batch of images in one forward pass
+        
+        Args:
+            images: PIL Image objects
+            
+        Returns:
+            One embedding vector per image, in input order
+        """
         if self.model is None or self.processor is None:
             raise RuntimeError("Model not loaded. Call load_model() first.")
         
         try:
-            # Preprocess image
-            inputs = self.processor(images=image, return_tensors="pt")
+            # Preprocess images (mixed modes cannot be stacked into one batch)
+            images = [image.convert("RGB") for image in images]
+            inputs = self.processor(images=images, return_tensors="pt")
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
             
-            # Generate embedding
+            # Generate embeddings
             with torch.no_grad():
                 outputs = self.model.get_image_features(**inputs)
-                
-            # Normalize embedding (important for cosine similarity)
-            embedding = outputs[0].cpu().numpy()
-            embedding = embedding / (embedding**2).sum()**0.5
             
-            return embedding.tolist()
+            return self._normalize(outputs)
             
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
             raise RuntimeError(f"Failed to generate embedding: {e}")
     
+    def generate_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embedding vectors for a batch of texts in one forward pass
+        
+        Args:
+            texts: Text queries
+            
+        Returns:
+            One embedding vector per text, in input order
+        """
+        if self.model is None or self.processor is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        try:
+            # SigLIP was trained with max_length padding
+            inputs = self.processor(text=texts, padding="max_length", truncation=True, return_tensors="pt")
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            
+            with torch.no_grad():
+                outputs = self.model.get_text_features(**inputs)
+            
+            return self._normalize(outputs)
+            
+        except Exception as e:
+            logger.error(f"Failed to generate text embedding: {e}")
+            raise RuntimeError(f"Failed to generate text embedding: {e}")
+    
+    @staticmethod
+    def _normalize(outputs: torch.Tensor) -> List[List[float]]:
+        """Normalize embeddings (important for cosine similarity)"""
+        embeddings = outputs.cpu().numpy()
+        embeddings = embeddings / ((embeddings**2).sum(axis=1, keepdims=True)**0.5)
+        return embeddings.tolist()
+    
     def get_embedding_dimension(self) -> int:
         """Get the dimension of the embedding vectors"""
         return 768  # SigLIP base model dimension
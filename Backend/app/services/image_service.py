@@ -1,16 +1,28 @@
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Dict, Any, AsyncIterator
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
 from PIL import Image
 import io
+import tempfile
 import logging
 
 from app.config.settings import settings
-from app.models.image import ImageResponse
+from app.models.image import (
+    ImageResponse,
+    ImageListResponse,
+    SearchResult,
+    BatchSearchResult,
+    ImageFilter,
+    FacetValue,
+    FacetResponse,
+)
 from app.services.embedding_service import embedding_service
 from app.services.qdrant_service import qdrant_service
+from app.services.storage_service import storage_service, StoredFile, hash_content
+from app.services.admission_service import admission_controller
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +53,15 @@ class ImageService:
                 detail="Invalid image file or corrupted image"
             )
     
+    @staticmethod
+    def estimate_decode_bytes(content: bytes) -> int:
+        """Estimate memory needed to decode an image from its header"""
+        try:
+            width, height = Image.open(io.BytesIO(content)).size
+            return width * height * 4
+        except Exception:
+            return len(content)
+    
     @staticmethod
     async def save_image(file: UploadFile) -> ImageResponse:
         """Save uploaded image to file system"""
@@ -58,18 +79,31 @@ class ImageService:
         # Validate image content
         ImageService.validate_image_content(content)
         
-        # Check if file already exists
-        file_path = settings.upload_path / file.filename
-        if file_path.exists():
+        # Wait for decode and inference capacity, then keep the blocking
+        # storage and embedding work off the event loop while it is held
+        async with admission_controller.admit(ImageService.estimate_decode_bytes(content)):
+            return await run_in_threadpool(ImageService._store_image, file, content)
+    
+    @staticmethod
+    def _store_image(file: UploadFile, content: bytes) -> ImageResponse:
+        """Store a validated image and its embedding"""
+        # Save file under its content hash, failing if the filename is taken
+        stored = StoredFile(
+            filename=file.filename,
+            content_hash=hash_content(content),
+            extension=file.filename.split(".")[-1].lower(),
+            size=len(content),
+            mime_type=file.content_type or "image/jpeg",
+            uploaded_at=datetime.now(timezone.utc).isoformat()
+        )
+        try:
+            storage_service.put(stored, content)
+        except FileExistsError:
             raise HTTPException(
                 status_code=409,
                 detail=f"File '{file.filename}' already exists"
             )
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
         # Generate and store embedding
         try:
             # Open image for embedding generation
@@ -81,12 +115,13 @@ class ImageService:
             # Prepare metadata
             metadata = {
                 "filename": file.filename,
-                "file_path": str(file_path),
-                "uploaded_at": datetime.now().isoformat(),
-                "file_size": len(content),
+                "file_path": stored.key,
+                "content_hash": stored.content_hash,
+                "uploaded_at": stored.uploaded_at,
+                "file_size": stored.size,
                 "image_width": image.width,
                 "image_height": image.height,
-                "mime_type": file.content_type or "image/jpeg"
+                "mime_type": stored.mime_type
             }
             
             # Store in Qdrant
@@ -100,54 +135,339 @@ class ImageService:
             # Image is still saved, embedding can be regenerated later
         
         # Create response
+        return ImageService.stored_to_response(stored)
+    
+    @staticmethod
+    def stored_to_response(stored: StoredFile, duplicate_group: Optional[str] = None) -> ImageResponse:
+        """Build an image response from a storage index entry"""
         return ImageResponse(
-            id=file.filename,
-            name=file.filename,
-            url=f"/api/v1/images/{file.filename}",
-            size=len(content),
-            type=file.content_type or "image/jpeg",
-            uploaded_at=datetime.now().isoformat()
+            id=stored.filename,
+            name=stored.filename,
+            url=f"/api/v1/images/{stored.filename}",
+            size=stored.size,
+            type=stored.mime_type,
+            uploaded_at=stored.uploaded_at,
+            duplicate_group=duplicate_group
+        )
+    
+    @staticmethod
+    def payload_to_response(payload: Dict[str, Any]) -> ImageResponse:
+        """Build an image response from a Qdrant point payload"""
+        filename = payload.get("filename", "")
+        return ImageResponse(
+            id=filename,
+            name=filename,
+            url=f"/api/v1/images/{filename}",
+            size=payload.get("file_size", 0),
+            type=payload.get("mime_type", "image/jpeg"),
+            uploaded_at=payload.get("uploaded_at", ""),
+            duplicate_group=payload.get("duplicate_group")
         )
     
+    @staticmethod
+    async def read_query_image(file: UploadFile) -> bytes:
+        """Read and validate an uploaded query image"""
+        ImageService.validate_image(file)
+        
+        content = await file.read()
+        if len(content) > settings.max_file_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size exceeds maximum limit of {settings.max_file_size / 1024 / 1024}MB"
+            )
+        
+        ImageService.validate_image_content(content)
+        return content
+    
+    @staticmethod
+    async def search_similar(
+        file: UploadFile,
+        limit: int,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        image_filter: Optional[ImageFilter] = None
+    ) -> List[SearchResult]:
+        """Find images similar to an uploaded query image"""
+        content = await ImageService.read_query_image(file)
+        
+        try:
+            async with admission_controller.admit(ImageService.estimate_decode_bytes(content)):
+                embedding = await run_in_threadpool(ImageService._embed_image, content)
+            points = await run_in_threadpool(
+                qdrant_service.search,
+                embedding,
+                limit=limit,
+                oversampling=oversampling,
+                rescore=rescore,
+                image_filter=image_filter
+            )
+        except RuntimeError as e:
+            logger.error(f"Search failed for {file.filename}: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        return [
+            SearchResult(
+                image=ImageService.payload_to_response(point.payload or {}),
+                score=point.score
+            )
+            for point in points
+        ]
+    
+    @staticmethod
+    def _embed_image(content: bytes) -> List[float]:
+        """Decode a query image and generate its embedding"""
+        image = Image.open(io.BytesIO(content))
+        return embedding_service.generate_embedding(image)
+    
+    @staticmethod
+    async def read_batch_queries(
+        files: List[UploadFile],
+        texts: List[str],
+        spool_dir: Path
+    ) -> List[Dict[str, Any]]:
+        """
+        Spool batch search query files to disk and collect the queries
+        
+        Upload handles are closed once the endpoint returns, so each query
+        image is copied to `spool_dir` and only read back, validated and
+        decoded chunk by chunk while streaming. Invalid images are kept as
+        queries carrying an error, so every query gets a line in the
+        streamed response.
+        """
+        queries = []
+        
+        for position, file in enumerate(files):
+            path = spool_dir / str(position)
+            try:
+                ImageService.validate_image(file)
+                
+                size = 0
+                with open(path, "wb") as f:
+                    while chunk := await file.read(1024 * 1024):
+                        size += len(chunk)
+                        if size > settings.max_file_size:
+                            raise HTTPException(
+                                status_code=400,
+                                detail=f"File size exceeds maximum limit of {settings.max_file_size / 1024 / 1024}MB"
+                            )
+                        f.write(chunk)
+                
+                queries.append({"query": file.filename, "path": path})
+            except HTTPException as e:
+                path.unlink(missing_ok=True)
+                queries.append({"query": file.filename, "error": str(e.detail)})
+        
+        for text in texts:
+            queries.append({"query": text, "text": text})
+        
+        return queries
+    
+    @staticmethod
+    def _load_chunk_images(chunk: List[tuple]) -> None:
+        """Read and validate the spooled query images of one chunk"""
+        for _, query in chunk:
+            if "path" not in query:
+                continue
+            
+            path = query.pop("path")
+            try:
+                content = path.read_bytes()
+                ImageService.validate_image_content(content)
+                query["image"] = content
+                query["decode_bytes"] = ImageService.estimate_decode_bytes(content)
+            except HTTPException as e:
+                query["error"] = str(e.detail)
+            finally:
+                path.unlink(missing_ok=True)
+    
+    @staticmethod
+    def _embed_queries(queries: List[Dict[str, Any]]) -> List[List[float]]:
+        """Embed image and text queries with one forward pass per modality"""
+        embeddings: List[Optional[List[float]]] = [None] * len(queries)
+        
+        image_positions = [i for i, query in enumerate(queries) if "image" in query]
+        if image_positions:
+            images = [Image.open(io.BytesIO(queries[i]["image"])) for i in image_positions]
+            for position, embedding in zip(image_positions, embedding_service.generate_embeddings(images)):
+                embeddings[position] = embedding
+        
+        text_positions = [i for i, query in enumerate(queries) if "text" in query]
+        if text_positions:
+            texts = [queries[i]["text"] for i in text_positions]
+            for position, embedding in zip(text_positions, embedding_service.generate_text_embeddings(texts)):
+                embeddings[position] = embedding
+        
+        return embeddings
+    
+    @staticmethod
+    async def stream_batch_search(
+        queries: List[Dict[str, Any]],
+        spool: tempfile.TemporaryDirectory,
+        limit: int,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        image_filter: Optional[ImageFilter] = None
+    ) -> AsyncIterator[str]:
+        """
+        Search for many queries, yielding one NDJSON line per query
+        
+        Queries are processed in chunks of `batch_search_chunk_size`, each
+        with one batched forward pass and one Qdrant batch request, so the
+        client receives results while later chunks are still running. Each
+        chunk is admitted separately; a shed chunk yields error lines. Only
+        one chunk of query images is held in memory, and the spool
+        directory is removed when streaming ends.
+        
+        Chunks wait for admission on the event loop and only take a worker
+        thread for file reads, inference and the Qdrant request, so queued
+        batches cannot starve the threadpool that admitted work runs on.
+        """
+        try:
+            async for line in ImageService._search_chunks(queries, limit, oversampling, rescore, image_filter):
+                yield line
+        finally:
+            spool.cleanup()
+    
+    @staticmethod
+    async def _search_chunks(
+        queries: List[Dict[str, Any]],
+        limit: int,
+        oversampling: Optional[float],
+        rescore: Optional[bool],
+        image_filter: Optional[ImageFilter]
+    ) -> AsyncIterator[str]:
+        """Run batch search chunk by chunk, yielding NDJSON lines"""
+        chunk_size = settings.batch_search_chunk_size
+        
+        for start in range(0, len(queries), chunk_size):
+            chunk = list(enumerate(queries[start:start + chunk_size], start))
+            await run_in_threadpool(ImageService._load_chunk_images, chunk)
+            pending = [(index, query) for index, query in chunk if "error" not in query]
+            lines = {
+                index: BatchSearchResult(index=index, query=query["query"], error=query["error"])
+                for index, query in chunk
+                if "error" in query
+            }
+            
+            if pending:
+                decode_bytes = sum(query.get("decode_bytes", 0) for _, query in pending)
+                try:
+                    async with admission_controller.admit(decode_bytes):
+                        embeddings = await run_in_threadpool(
+                            ImageService._embed_queries,
+                            [query for _, query in pending]
+                        )
+                    results = await run_in_threadpool(
+                        qdrant_service.search_batch,
+                        embeddings,
+                        limit=limit,
+                        oversampling=oversampling,
+                        rescore=rescore,
+                        image_filter=image_filter
+                    )
+                    for (index, query), points in zip(pending, results):
+                        lines[index] = BatchSearchResult(
+                            index=index,
+                            query=query["query"],
+                            results=[
+                                SearchResult(
+                                    image=ImageService.payload_to_response(point.payload or {}),
+                                    score=point.score
+                                )
+                                for point in points
+                            ]
+                        )
+                except Exception as e:
+                    error = e.detail if isinstance(e, HTTPException) else str(e)
+                    logger.error(f"Batch search failed for queries {start}-{start + len(chunk) - 1}: {error}")
+                    for index, query in pending:
+                        lines[index] = BatchSearchResult(index=index, query=query["query"], error=error)
+            
+            # Release this chunk's image bytes before the next one is read
+            for _, query in chunk:
+                query.pop("image", None)
+            
+            for index in sorted(lines):
+                yield lines[index].model_dump_json() + "\n"
+    
     @staticmethod
     def get_all_images() -> List[ImageResponse]:
         """Get list of all uploaded images"""
-        images = []
-        upload_path = settings.upload_path
+        # Near-duplicate groups live in Qdrant; the listing still works without them
+        try:
+            groups = qdrant_service.duplicate_groups_by_filename()
+        except RuntimeError as e:
+            logger.warning(f"Listing images without duplicate groups: {e}")
+            groups = {}
         
-        if not upload_path.exists():
-            return images
+        # The storage index is already ordered by upload time (newest first)
+        return [
+            ImageService.stored_to_response(stored, groups.get(stored.filename))
+            for stored in storage_service.list()
+        ]
+    
+    @staticmethod
+    def get_filtered_images(
+        image_filter: ImageFilter,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> ImageListResponse:
+        """Get one page of images matching metadata filters, newest first"""
+        try:
+            payloads, next_cursor = qdrant_service.list_payloads(image_filter, limit=limit, cursor=cursor)
+            total = qdrant_service.count(image_filter)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
-        for file_path in upload_path.iterdir():
-            if file_path.is_file() and file_path.suffix.lower().lstrip('.') in settings.allowed_extensions_list:
-                stat = file_path.stat()
-                images.append(ImageResponse(
-                    id=file_path.name,
-                    name=file_path.name,
-                    url=f"/api/v1/images/{file_path.name}",
-                    size=stat.st_size,
-                    type=f"image/{file_path.suffix.lstrip('.')}",
-                    uploaded_at=datetime.fromtimestamp(stat.st_mtime).isoformat()
-                ))
+        return ImageListResponse(
+            images=[ImageService.payload_to_response(payload) for payload in payloads],
+            total=total,
+            next_cursor=next_cursor
+        )
+    
+    @staticmethod
+    def get_facets(image_filter: ImageFilter) -> FacetResponse:
+        """Count images per mime type, resolution bucket and near-duplicate group"""
+        try:
+            total = qdrant_service.count(image_filter)
+            mime_types = qdrant_service.facet("mime_type", image_filter)
+            duplicate_groups = qdrant_service.facet(
+                "duplicate_group",
+                image_filter,
+                limit=settings.facet_duplicate_group_limit
+            )
+            
+            # Cumulative resolution buckets: images at least this wide
+            min_widths = []
+            for width in settings.facet_min_width_buckets_list:
+                bucket_filter = image_filter.model_copy(
+                    update={"min_width": max(width, image_filter.min_width or 0)}
+                )
+                min_widths.append((width, qdrant_service.count(bucket_filter)))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
-        # Sort by upload time (newest first)
-        images.sort(key=lambda x: x.uploaded_at, reverse=True)
-        return images
+        return FacetResponse(
+            mime_type=[FacetValue(value=str(value), count=count) for value, count in mime_types],
+            min_width=[FacetValue(value=str(value), count=count) for value, count in min_widths],
+            duplicate_group=[FacetValue(value=str(value), count=count) for value, count in duplicate_groups],
+            total=total
+        )
     
     @staticmethod
     def delete_image(filename: str) -> bool:
-        """Delete an image from file system"""
-        file_path = settings.upload_path / filename
-        
-        if not file_path.exists():
+        """Delete an image from storage"""
+        if not storage_service.exists(filename):
             raise HTTPException(
                 status_code=404,
                 detail=f"Image '{filename}' not found"
             )
         
         try:
-            # Delete from file system
-            file_path.unlink()
+            # Delete from storage
+            storage_service.delete(filename)
             
             # Delete from Qdrant
             try:
@@ -1,14 +1,66 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from datetime import datetime
+import base64
+import json
 import uuid
 import time
 import logging
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    ScoredPoint,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    ProductQuantization,
+    QuantizationConfig,
+    Disabled,
+    VectorParamsDiff,
+    QuantizationSearchParams,
+    SearchParams,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    MatchAny,
+    Range,
+    DatetimeRange,
+    PayloadSchemaType,
+    OrderBy,
+    Direction,
+    Record,
+    PayloadField,
+    IsEmptyCondition,
+    SetPayload,
+    SetPayloadOperation,
+    FilterSelector,
+    QueryRequest,
+    Batch,
+    ExtendedPointId,
+)
 
 from app.config.settings import settings
+from app.models.image import ImageFilter
 
 logger = logging.getLogger(__name__)
 
+# Payload fields written by ImageService.save_image that filters and facets query
+PAYLOAD_INDEXES = {
+    "filename": PayloadSchemaType.KEYWORD,
+    "mime_type": PayloadSchemaType.KEYWORD,
+    "uploaded_at": PayloadSchemaType.DATETIME,
+    "image_width": PayloadSchemaType.INTEGER,
+    "image_height": PayloadSchemaType.INTEGER,
+    "file_size": PayloadSchemaType.INTEGER,
+    "duplicate_group": PayloadSchemaType.KEYWORD,
+}
+
+# Payload fields written by the near-duplicate job
+DUPLICATE_PAYLOAD_KEYS = ["duplicate_group", "duplicate_group_size", "duplicate_run"]
+
 
 class QdrantService:
     """Service for managing Qdrant vector database operations"""
@@ -66,8 +118,13 @@ class QdrantService:
             collections = self.client.get_collections().collections
             collection_names = [col.name for col in collections]
             
+            quantization_config = self._build_quantization_config()
+            
             if self.collection_name in collection_names:
                 logger.info(f"Collection '{self.collection_name}' already exists")
+                
+                self._sync_storage_config(quantization_config)
+                self.create_payload_indexes()
                 return
             
             # Create collection
@@ -77,16 +134,569 @@ class QdrantService:
                 collection_name=self.collection_name,
                 vectors_config=VectorParams(
                     size=vector_size,
-                    distance=Distance.COSINE
-                )
+                    distance=Distance.COSINE,
+                    on_disk=settings.qdrant_vectors_on_disk
+                ),
+                quantization_config=quantization_config
             )
             
             logger.info(f"Collection '{self.collection_name}' created successfully")
             
+            self.create_payload_indexes()
+            
         except Exception as e:
             logger.error(f"Failed to create collection: {e}")
             raise RuntimeError(f"Failed to create collection: {e}")
     
+    def vector_size(self) -> Optional[int]:
+        """
+        Get the vector dimension of the collection
+        
+        Returns:
+            Dimension of the unnamed vector, or None if the collection uses named vectors
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            vectors = self.client.get_collection(self.collection_name).config.params.vectors
+        except Exception as e:
+            logger.error(f"Failed to read collection config: {e}")
+            raise RuntimeError(f"Failed to read collection config: {e}")
+        
+        return vectors.size if isinstance(vectors, VectorParams) else None
+    
+    def create_payload_indexes(self) -> None:
+        """Create payload indexes for filtered search, ordering and facets"""
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            existing = self.client.get_collection(self.collection_name).payload_schema
+            
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                if field_name in existing:
+                    continue
+                
+                logger.info(f"Creating {field_schema.value} payload index on '{field_name}'")
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+                
+        except Exception as e:
+            logger.error(f"Failed to create payload indexes: {e}")
+            raise RuntimeError(f"Failed to create payload indexes: {e}")
+    
+    @staticmethod
+    def _describe_quantization(config: Optional[QuantizationConfig]) -> tuple:
+        """Reduce a quantization config to (mode, always_ram) for comparison"""
+        if isinstance(config, ScalarQuantization):
+            return "scalar", bool(config.scalar.always_ram)
+        if isinstance(config, BinaryQuantization):
+            return "binary", bool(config.binary.always_ram)
+        if isinstance(config, ProductQuantization):
+            return "product", bool(config.product.always_ram)
+        return "none", False
+    
+    def _sync_storage_config(self, quantization_config: Optional[QuantizationConfig]) -> None:
+        """Apply changed quantization and on-disk settings to an existing collection"""
+        collection_config = self.client.get_collection(self.collection_name).config
+        
+        current = self._describe_quantization(collection_config.quantization_config)
+        configured = self._describe_quantization(quantization_config)
+        if current != configured:
+            logger.info(
+                f"Updating quantization on '{self.collection_name}' "
+                f"from {current[0]} to {configured[0]}"
+            )
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                quantization_config=quantization_config or Disabled.DISABLED
+            )
+        
+        vectors = collection_config.params.vectors
+        if isinstance(vectors, VectorParams) and bool(vectors.on_disk) != settings.qdrant_vectors_on_disk:
+            logger.info(
+                f"Updating on-disk vector storage on '{self.collection_name}' "
+                f"to {settings.qdrant_vectors_on_disk}"
+            )
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": VectorParamsDiff(on_disk=settings.qdrant_vectors_on_disk)}
+            )
+    
+    def _build_quantization_config(self) -> Optional[QuantizationConfig]:
+        """Build the quantization config selected in settings"""
+        mode = settings.qdrant_quantization.strip().lower()
+        
+        if mode == "none":
+            return None
+        
+        if mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=settings.qdrant_quantization_always_ram
+                )
+            )
+        
+        if mode == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(
+                    always_ram=settings.qdrant_quantization_always_ram
+                )
+            )
+        
+        raise ValueError(f"Unknown quantization mode '{settings.qdrant_quantization}'")
+    
+    def build_search_params(
+        self,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        exact: bool = False
+    ) -> SearchParams:
+        """
+        Build search parameters for a two-stage quantized search
+        
+        The candidate pass runs over the quantized vectors, fetching
+        `limit * oversampling` candidates, which are then rescored with
+        the original float32 vectors when rescoring is enabled.
+        
+        Args:
+            oversampling: Candidate oversampling factor (defaults to settings)
+            rescore: Rescore candidates with full-precision vectors (defaults to settings)
+            exact: Bypass the index and quantized vectors (ground truth)
+        """
+        return SearchParams(
+            exact=exact,
+            quantization=QuantizationSearchParams(
+                ignore=exact,
+                rescore=settings.search_rescore if rescore is None else rescore,
+                oversampling=settings.search_oversampling if oversampling is None else oversampling
+            )
+        )
+    
+    def build_filter(self, image_filter: Optional[ImageFilter]) -> Optional[Filter]:
+        """
+        Translate image metadata filters into a Qdrant filter
+        
+        Args:
+            image_filter: Metadata filters, or None for no filtering
+            
+        Returns:
+            Qdrant filter, or None if no filter is set
+        """
+        if image_filter is None:
+            return None
+        
+        conditions = []
+        
+        if image_filter.uploaded_after or image_filter.uploaded_before:
+            conditions.append(FieldCondition(
+                key="uploaded_at",
+                range=DatetimeRange(gte=image_filter.uploaded_after, lte=image_filter.uploaded_before)
+            ))
+        
+        if image_filter.min_width is not None:
+            conditions.append(FieldCondition(key="image_width", range=Range(gte=image_filter.min_width)))
+        
+        if image_filter.min_height is not None:
+            conditions.append(FieldCondition(key="image_height", range=Range(gte=image_filter.min_height)))
+        
+        if image_filter.min_file_size is not None or image_filter.max_file_size is not None:
+            conditions.append(FieldCondition(
+                key="file_size",
+                range=Range(gte=image_filter.min_file_size, lte=image_filter.max_file_size)
+            ))
+        
+        if image_filter.mime_types:
+            conditions.append(FieldCondition(key="mime_type", match=MatchAny(any=image_filter.mime_types)))
+        
+        if image_filter.duplicate_group:
+            conditions.append(FieldCondition(key="duplicate_group", match=MatchValue(value=image_filter.duplicate_group)))
+        
+        exclusions = []
+        no_group = IsEmptyCondition(is_empty=PayloadField(key="duplicate_group"))
+        if image_filter.has_duplicates is True:
+            exclusions.append(no_group)
+        elif image_filter.has_duplicates is False:
+            conditions.append(no_group)
+        
+        if not conditions and not exclusions:
+            return None
+        return Filter(must=conditions or None, must_not=exclusions or None)
+    
+    def search(
+        self,
+        embedding: List[float],
+        limit: int = 10,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        exact: bool = False,
+        image_filter: Optional[ImageFilter] = None
+    ) -> List[ScoredPoint]:
+        """
+        Search for the nearest embeddings
+        
+        Args:
+            embedding: Query embedding vector
+            limit: Maximum number of results
+            oversampling: Candidate oversampling factor (defaults to settings)
+            rescore: Rescore candidates with full-precision vectors (defaults to settings)
+            exact: Bypass the index and compute exact scores
+            image_filter: Restrict results to images matching these metadata filters
+            
+        Returns:
+            Scored points ordered by similarity
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            response = self.client.query_points(
+                collection_name=self.collection_name,
+                query=embedding,
+                query_filter=self.build_filter(image_filter),
+                limit=limit,
+                search_params=self.build_search_params(oversampling, rescore, exact),
+                with_payload=True
+            )
+            return response.points
+            
+        except Exception as e:
+            logger.error(f"Failed to search embeddings: {e}")
+            raise RuntimeError(f"Failed to search embeddings: {e}")
+    
+    def search_batch(
+        self,
+        embeddings: List[List[float]],
+        limit: int = 10,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        image_filter: Optional[ImageFilter] = None
+    ) -> List[List[ScoredPoint]]:
+        """
+        Search for the nearest embeddings of several queries in one request
+        
+        Args:
+            embeddings: Query embedding vectors
+            limit: Maximum number of results per query
+            oversampling: Candidate oversampling factor (defaults to settings)
+            rescore: Rescore candidates with full-precision vectors (defaults to settings)
+            image_filter: Restrict results to images matching these metadata filters
+            
+        Returns:
+            Scored points per query, in query order
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        search_params = self.build_search_params(oversampling, rescore)
+        query_filter = self.build_filter(image_filter)
+        
+        try:
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    QueryRequest(
+                        query=embedding,
+                        filter=query_filter,
+                        params=search_params,
+                        limit=limit,
+                        with_payload=True
+                    )
+                    for embedding in embeddings
+                ]
+            )
+            return [response.points for response in responses]
+            
+        except Exception as e:
+            logger.error(f"Failed to batch search embeddings: {e}")
+            raise RuntimeError(f"Failed to batch search embeddings: {e}")
+    
+    @staticmethod
+    def _encode_cursor(uploaded_at: str, filenames: List[str]) -> str:
+        """Encode the position after the last listed image as an opaque cursor"""
+        data = json.dumps({"uploaded_at": uploaded_at, "filenames": filenames})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, List[str]]:
+        """
+        Decode a listing cursor
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            uploaded_at = data["uploaded_at"]
+            datetime.fromisoformat(uploaded_at)
+            return uploaded_at, list(data["filenames"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+    
+    def list_payloads(
+        self,
+        image_filter: Optional[ImageFilter] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List payloads of images matching the filters, newest first
+        
+        Pages are chained with an `uploaded_at` cursor compatible with
+        `order_by`. Images sharing the cursor timestamp that were already
+        listed are excluded, so ties never repeat or go missing.
+        
+        Args:
+            image_filter: Metadata filters
+            limit: Maximum number of payloads
+            cursor: Cursor returned with the previous page
+            
+        Returns:
+            Point payloads ordered by upload time, and the cursor of the
+            next page or None on the last page
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        start_from = None
+        seen: List[str] = []
+        if cursor:
+            start_from, seen = self._decode_cursor(cursor)
+        
+        scroll_filter = self.build_filter(image_filter) or Filter()
+        if seen:
+            scroll_filter.must_not = (scroll_filter.must_not or []) + [
+                FieldCondition(key="filename", match=MatchAny(any=seen))
+            ]
+        
+        try:
+            points, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                order_by=OrderBy(
+                    key="uploaded_at",
+                    direction=Direction.DESC,
+                    start_from=datetime.fromisoformat(start_from) if start_from else None
+                ),
+                limit=limit,
+                with_payload=True,
+                with_vectors=False
+            )
+        except Exception as e:
+            logger.error(f"Failed to list payloads: {e}")
+            raise RuntimeError(f"Failed to list payloads: {e}")
+        
+        payloads = [point.payload or {} for point in points]
+        if len(payloads) < limit:
+            return payloads, None
+        
+        last = payloads[-1].get("uploaded_at", "")
+        filenames = [payload.get("filename", "") for payload in payloads if payload.get("uploaded_at") == last]
+        if last == start_from:
+            filenames = seen + filenames
+        return payloads, self._encode_cursor(last, filenames)
+    
+    def count(self, image_filter: Optional[ImageFilter] = None) -> int:
+        """Count images matching the filters using the payload indexes"""
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            return self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self.build_filter(image_filter),
+                exact=True
+            ).count
+            
+        except Exception as e:
+            logger.error(f"Failed to count points: {e}")
+            raise RuntimeError(f"Failed to count points: {e}")
+    
+    def facet(
+        self,
+        key: str,
+        image_filter: Optional[ImageFilter] = None,
+        limit: int = 10
+    ) -> List[Tuple[Any, int]]:
+        """
+        Count points per value of an indexed keyword field
+        
+        Counts come from the payload index, so no points are scanned.
+        
+        Args:
+            key: Indexed payload field
+            image_filter: Metadata filters applied before counting
+            limit: Maximum number of values
+            
+        Returns:
+            (value, count) pairs, most frequent first
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            response = self.client.facet(
+                collection_name=self.collection_name,
+                key=key,
+                facet_filter=self.build_filter(image_filter),
+                limit=limit
+            )
+            return [(hit.value, hit.count) for hit in response.hits]
+            
+        except Exception as e:
+            logger.error(f"Failed to compute facet '{key}': {e}")
+            raise RuntimeError(f"Failed to compute facet '{key}': {e}")
+    
+    def iter_points(
+        self,
+        page_size: int = 1024,
+        with_vectors: bool = True,
+        with_payload: bool = False
+    ) -> Iterator[List[Record]]:
+        """
+        Iterate over the whole collection in scroll pages
+        
+        Only one page is held in memory at a time.
+        
+        Args:
+            page_size: Number of points per page
+            with_vectors: Include vectors
+            with_payload: Include payloads
+            
+        Yields:
+            Pages of points
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        offset = None
+        while True:
+            try:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=page_size,
+                    offset=offset,
+                    with_vectors=with_vectors,
+                    with_payload=with_payload
+                )
+            except Exception as e:
+                logger.error(f"Failed to scroll points: {e}")
+                raise RuntimeError(f"Failed to scroll points: {e}")
+            
+            if points:
+                yield points
+            
+            if offset is None:
+                return
+    
+    def set_duplicate_groups(
+        self,
+        groups: List[Tuple[str, List[str]]],
+        run_id: str
+    ) -> None:
+        """
+        Store near-duplicate group membership in point payloads
+        
+        Args:
+            groups: (group id, member point ids) pairs
+            run_id: Identifier of the job run writing the groups
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        operations = [
+            SetPayloadOperation(
+                set_payload=SetPayload(
+                    payload={
+                        "duplicate_group": group_id,
+                        "duplicate_group_size": len(point_ids),
+                        "duplicate_run": run_id
+                    },
+                    points=point_ids
+                )
+            )
+            for group_id, point_ids in groups
+        ]
+        
+        try:
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=operations
+            )
+        except Exception as e:
+            logger.error(f"Failed to store duplicate groups: {e}")
+            raise RuntimeError(f"Failed to store duplicate groups: {e}")
+    
+    def duplicate_groups_by_filename(self) -> Dict[str, str]:
+        """
+        Map filenames of images in a near-duplicate group to their group id
+        
+        Only points carrying a group are scrolled, so the cost scales with
+        the number of duplicates rather than the collection size.
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        groups = {}
+        offset = None
+        try:
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=Filter(
+                        must_not=[IsEmptyCondition(is_empty=PayloadField(key="duplicate_group"))]
+                    ),
+                    limit=1024,
+                    offset=offset,
+                    with_payload=["filename", "duplicate_group"],
+                    with_vectors=False
+                )
+                for point in points:
+                    payload = point.payload or {}
+                    if "filename" in payload:
+                        groups[payload["filename"]] = payload["duplicate_group"]
+                if offset is None:
+                    return groups
+        except Exception as e:
+            logger.error(f"Failed to load duplicate groups: {e}")
+            raise RuntimeError(f"Failed to load duplicate groups: {e}")
+    
+    def clear_stale_duplicate_groups(self, run_id: str) -> None:
+        """
+        Remove duplicate group payloads not written by the given run
+        
+        Args:
+            run_id: Identifier of the latest job run
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            self.client.delete_payload(
+                collection_name=self.collection_name,
+                keys=DUPLICATE_PAYLOAD_KEYS,
+                points=FilterSelector(
+                    filter=Filter(
+                        must_not=[
+                            IsEmptyCondition(is_empty=PayloadField(key="duplicate_group")),
+                            FieldCondition(key="duplicate_run", match=MatchValue(value=run_id))
+                        ]
+                    )
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to clear duplicate groups: {e}")
+            raise RuntimeError(f"Failed to clear duplicate groups: {e}")
+    
     def store_embedding(
         self,
         embedding: List[float],
@@ -129,6 +739,58 @@ class QdrantService:
             logger.error(f"Failed to store embedding: {e}")
             raise RuntimeError(f"Failed to store embedding: {e}")
     
+    def upsert_batch(
+        self,
+        ids: List[ExtendedPointId],
+        vectors: List[List[float]],
+        payloads: List[Dict[str, Any]],
+        wait: bool = True
+    ) -> None:
+        """
+        Store a batch of points with their original ids
+        
+        Args:
+            ids: Point ids
+            vectors: Embedding vectors
+            payloads: Point payloads
+            wait: Wait until the batch is persisted
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=Batch(ids=ids, vectors=vectors, payloads=payloads),
+                wait=wait
+            )
+        except Exception as e:
+            logger.error(f"Failed to upsert batch: {e}")
+            raise RuntimeError(f"Failed to upsert batch: {e}")
+    
+    def update_payload(self, filename: str, payload: Dict[str, Any]) -> None:
+        """
+        Merge payload fields into the embedding of a file
+        
+        Args:
+            filename: Name of the image file
+            payload: Payload fields to set
+        """
+        if self.client is None:
+            raise RuntimeError("Qdrant client not connected")
+        
+        try:
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=payload,
+                points=Filter(
+                    must=[FieldCondition(key="filename", match=MatchValue(value=filename))]
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to update payload: {e}")
+            raise RuntimeError(f"Failed to update payload: {e}")
+    
     def delete_embedding(self, filename: str) -> bool:
         """
         Delete embedding by filename
@@ -0,0 +1,313 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+SAVE_ATTEMPTS = 3
+
+
+@dataclass
+class StoredFile:
+    """Filename to content hash mapping entry"""
+    filename: str
+    content_hash: str
+    extension: str
+    size: int
+    mime_type: str
+    uploaded_at: str
+
+    @property
+    def key(self) -> str:
+        """Storage key of the file content"""
+        return content_key(self.content_hash, self.extension)
+
+
+def content_key(content_hash: str, extension: str) -> str:
+    """
+    Build the sharded storage key for a content hash
+
+    A depth of 2 maps `abcdef...` to `ab/cd/abcdef....<ext>`.
+    """
+    depth = settings.storage_shard_depth
+    shards = [content_hash[i * 2:i * 2 + 2] for i in range(depth)]
+    return "/".join(shards + [f"{content_hash}.{extension}"])
+
+
+def hash_content(content: bytes) -> str:
+    """SHA-256 hex digest of file content"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class StorageBackend(ABC):
+    """Interface for blob storage keyed by content-addressed paths"""
+
+    @abstractmethod
+    def save(self, key: str, content: bytes) -> None:
+        """Store content under a key"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Check whether a key exists"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete a key if it exists"""
+
+    @abstractmethod
+    def open(self, key: str) -> Iterator[bytes]:
+        """Stream the content stored under a key"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Local file path for a key, if the backend stores files locally"""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Store blobs in a hash-prefix sharded directory tree"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    def save(self, key: str, content: bytes) -> None:
+        path = self.local_path(key)
+
+        # Write to a temporary file first so readers never see partial content
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+
+        # A concurrent delete may prune the shard directory between mkdir and
+        # open; once the temporary file exists the directory is not empty
+        for attempt in range(SAVE_ATTEMPTS):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                break
+            except FileNotFoundError:
+                if attempt == SAVE_ATTEMPTS - 1:
+                    raise
+        os.replace(tmp_path, path)
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        path = self.local_path(key)
+        path.unlink(missing_ok=True)
+
+        # Remove emptied shard directories
+        for parent in path.parents:
+            if parent == self.root:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    def open(self, key: str) -> Iterator[bytes]:
+        with open(self.local_path(key), "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+
+class S3StorageBackend(StorageBackend):
+    """Store blobs in an S3-compatible bucket (AWS S3, MinIO, ...)"""
+
+    def __init__(self):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("S3 storage backend requires boto3: pip install boto3")
+
+        self._client_error = ClientError
+        self.bucket = settings.s3_bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.s3_endpoint_url or None,
+            aws_access_key_id=settings.s3_access_key or None,
+            aws_secret_access_key=settings.s3_secret_key or None,
+            region_name=settings.s3_region
+        )
+
+    def save(self, key: str, content: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=content)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def open(self, key: str) -> Iterator[bytes]:
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        yield from response["Body"].iter_chunks(CHUNK_SIZE)
+
+
+class StorageService:
+    """Content-addressed image storage with a filename to hash index"""
+
+    def __init__(self):
+        self.backend: Optional[StorageBackend] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def initialize(self) -> None:
+        """Create the storage backend and open the filename index"""
+        backend = settings.storage_backend.strip().lower()
+
+        if backend == "local":
+            self.backend = LocalStorageBackend(settings.upload_path)
+        elif backend == "s3":
+            self.backend = S3StorageBackend()
+        else:
+            raise RuntimeError(f"Unknown storage backend '{settings.storage_backend}'")
+
+        index_path = settings.upload_path / settings.storage_index_file
+        self._db = sqlite3.connect(index_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                filename TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mime_type TEXT NOT NULL,
+                uploaded_at TEXT NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_files_hash ON files (content_hash)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_files_uploaded_at ON files (uploaded_at)")
+        self._db.commit()
+
+        logger.info(f"Storage initialized ({backend} backend, index at {index_path})")
+
+    def _require_initialized(self) -> None:
+        if self.backend is None or self._db is None:
+            raise RuntimeError("Storage not initialized. Call initialize() first.")
+
+    def get(self, filename: str) -> Optional[StoredFile]:
+        """Look up a stored file by filename"""
+        self._require_initialized()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT filename, content_hash, extension, size, mime_type, uploaded_at "
+                "FROM files WHERE filename = ?",
+                (filename,)
+            ).fetchone()
+
+        return StoredFile(*row) if row else None
+
+    def exists(self, filename: str) -> bool:
+        """Check whether a filename is stored"""
+        return self.get(filename) is not None
+
+    def list(self) -> List[StoredFile]:
+        """List stored files, newest first"""
+        self._require_initialized()
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT filename, content_hash, extension, size, mime_type, uploaded_at "
+                "FROM files ORDER BY uploaded_at DESC"
+            ).fetchall()
+
+        return [StoredFile(*row) for row in rows]
+
+    def local_path(self, stored: StoredFile) -> Optional[Path]:
+        """Local file path of a stored file, if the backend is local"""
+        self._require_initialized()
+        return self.backend.local_path(stored.key)
+
+    def open(self, stored: StoredFile) -> Iterator[bytes]:
+        """Stream the content of a stored file"""
+        self._require_initialized()
+        return self.backend.open(stored.key)
+
+    def put(self, stored: StoredFile, content: Optional[bytes] = None) -> None:
+        """
+        Record a filename mapping and store its content
+
+        Args:
+            stored: Mapping entry for the file
+            content: File content, omitted when the blob is already stored
+
+        Raises:
+            FileExistsError: If the filename is already mapped
+        """
+        self._require_initialized()
+
+        # Record the mapping first so a concurrent delete of another filename
+        # sharing this content sees the extra reference and keeps the blob
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT INTO files (filename, content_hash, extension, size, mime_type, uploaded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (stored.filename, stored.content_hash, stored.extension,
+                     stored.size, stored.mime_type, stored.uploaded_at)
+                )
+        except sqlite3.IntegrityError:
+            raise FileExistsError(stored.filename)
+
+        if content is None or self.backend.exists(stored.key):
+            return
+
+        try:
+            self.backend.save(stored.key, content)
+        except Exception:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM files WHERE filename = ?", (stored.filename,))
+            raise
+
+    def delete(self, filename: str) -> bool:
+        """
+        Remove a filename mapping, deleting its content once unreferenced
+
+        Returns:
+            True if the filename was mapped
+        """
+        self._require_initialized()
+
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT content_hash, extension FROM files WHERE filename = ?",
+                (filename,)
+            ).fetchone()
+            if row is None:
+                return False
+
+            content_hash, extension = row
+            self._db.execute("DELETE FROM files WHERE filename = ?", (filename,))
+            references = self._db.execute(
+                "SELECT COUNT(*) FROM files WHERE content_hash = ? AND extension = ?",
+                (content_hash, extension)
+            ).fetchone()[0]
+
+            if references == 0:
+                self.backend.delete(content_key(content_hash, extension))
+
+        return True
+
+
+# Global instance
+storage_service = StorageService()
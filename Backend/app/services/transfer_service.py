@@ -0,0 +1,233 @@
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Set
+import json
+import time
+import logging
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.bin"
+PAYLOADS_FILE = "payloads.parquet"
+
+PAYLOAD_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("payload", pa.string()),
+])
+
+
+@dataclass
+class TransferReport:
+    """Summary of an export or import run"""
+    points: int
+    dimension: int
+    dtype: str
+    elapsed: float
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.elapsed if self.elapsed else 0.0
+
+
+class TransferService:
+    """
+    Export and import the vector collection without re-embedding
+
+    An export directory holds:
+        manifest.json     - point count, vector dimension and dtype
+        vectors.bin       - row-major float32/float16 matrix, memory-mappable
+        payloads.parquet  - point ids and JSON payloads, row-aligned with vectors
+
+    Both directions stream one page or batch at a time, so memory use does
+    not grow with the collection size.
+    """
+
+    def export_collection(
+        self,
+        directory: Path,
+        dtype: str = "float32",
+        page_size: Optional[int] = None
+    ) -> TransferReport:
+        """
+        Stream all points of the collection into an export directory
+
+        Args:
+            directory: Target directory, created if missing
+            dtype: Vector storage type, float32 or float16
+            page_size: Points per Qdrant scroll page
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype '{dtype}'")
+
+        page_size = page_size or settings.transfer_batch_size
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / MANIFEST_FILE).unlink(missing_ok=True)
+        start = time.perf_counter()
+        count = 0
+        dimension = 0
+
+        with open(directory / VECTORS_FILE, "wb") as vector_file, \
+                pq.ParquetWriter(directory / PAYLOADS_FILE, PAYLOAD_SCHEMA, compression="zstd") as writer:
+            for page in qdrant_service.iter_points(page_size=page_size, with_vectors=True, with_payload=True):
+                vectors = np.asarray([point.vector for point in page], dtype=dtype)
+                dimension = vectors.shape[1]
+                vector_file.write(vectors.tobytes())
+
+                writer.write_batch(pa.record_batch(
+                    [
+                        pa.array([json.dumps(point.id) for point in page], pa.string()),
+                        pa.array([json.dumps(point.payload or {}) for point in page], pa.string()),
+                    ],
+                    schema=PAYLOAD_SCHEMA
+                ))
+
+                count += len(page)
+                logger.info(f"Exported {count} points")
+
+        # The manifest is written last, so an interrupted export is never importable
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "collection": qdrant_service.collection_name,
+            "count": count,
+            "dimension": dimension,
+            "dtype": dtype,
+        }
+        (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+        return TransferReport(count, dimension, dtype, time.perf_counter() - start)
+
+    @staticmethod
+    def _open_export_files(directory: Path, count: int, dimension: int, dtype: str) -> pq.ParquetFile:
+        """
+        Check the vector and payload files against the manifest before importing
+
+        Raises:
+            RuntimeError: If a file is missing, truncated or unreadable
+        """
+        vectors_path = directory / VECTORS_FILE
+        payloads_path = directory / PAYLOADS_FILE
+        for path in (vectors_path, payloads_path):
+            if not path.is_file():
+                raise RuntimeError(f"No {path.name} in {directory}, export is incomplete")
+
+        try:
+            expected_size = count * dimension * np.dtype(dtype).itemsize
+        except TypeError as e:
+            raise RuntimeError(f"Unsupported vector dtype '{dtype}' in {MANIFEST_FILE}: {e}")
+
+        actual_size = vectors_path.stat().st_size
+        if actual_size != expected_size:
+            raise RuntimeError(
+                f"{VECTORS_FILE} is {actual_size} bytes, expected {expected_size} "
+                f"for {count} vectors of dimension {dimension} ({dtype})"
+            )
+
+        try:
+            payloads = pq.ParquetFile(payloads_path)
+        except (pa.ArrowException, OSError) as e:
+            raise RuntimeError(f"Cannot read {PAYLOADS_FILE}: {e}")
+
+        if payloads.metadata.num_rows != count:
+            raise RuntimeError(
+                f"{PAYLOADS_FILE} has {payloads.metadata.num_rows} rows, "
+                f"expected {count} from {MANIFEST_FILE}"
+            )
+
+        return payloads
+
+    def import_collection(
+        self,
+        directory: Path,
+        batch_size: Optional[int] = None,
+        parallel: Optional[int] = None
+    ) -> TransferReport:
+        """
+        Upsert an export directory into the collection with its original ids
+
+        Batches are read lazily and upserted by a pool of workers with a
+        bounded number of batches in flight.
+
+        Args:
+            directory: Export directory
+            batch_size: Points per upsert request
+            parallel: Number of concurrent upsert requests
+        """
+        batch_size = batch_size or settings.transfer_batch_size
+        parallel = parallel or settings.transfer_parallel
+
+        manifest_path = directory / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise RuntimeError(f"No {MANIFEST_FILE} in {directory}, export is missing or incomplete")
+
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported export format version {manifest.get('format_version')}")
+
+        count = manifest["count"]
+        dimension = manifest["dimension"]
+        dtype = manifest["dtype"]
+        start = time.perf_counter()
+
+        if count == 0:
+            return TransferReport(0, dimension, dtype, time.perf_counter() - start)
+
+        payloads = self._open_export_files(directory, count, dimension, dtype)
+
+        qdrant_service.create_collection(vector_size=dimension)
+
+        # An existing collection may have been created by a different model
+        collection_dimension = qdrant_service.vector_size()
+        if collection_dimension != dimension:
+            raise RuntimeError(
+                f"Export has {dimension}-dimensional vectors but collection "
+                f"'{qdrant_service.collection_name}' expects {collection_dimension}"
+            )
+
+        vectors = np.memmap(directory / VECTORS_FILE, dtype=dtype, mode="r", shape=(count, dimension))
+
+        offset = 0
+        in_flight: Set[Future] = set()
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            for record_batch in payloads.iter_batches(batch_size=batch_size):
+                rows = record_batch.num_rows
+                if offset + rows > count:
+                    raise RuntimeError(f"Payload file has more rows than the {count} declared in the manifest")
+
+                ids = [json.loads(value) for value in record_batch.column("id").to_pylist()]
+                batch_payloads = [json.loads(value) for value in record_batch.column("payload").to_pylist()]
+                batch_vectors = np.asarray(vectors[offset:offset + rows], dtype=np.float32).tolist()
+
+                # Backpressure: keep at most two batches per worker in memory
+                while len(in_flight) >= parallel * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+                in_flight.add(executor.submit(
+                    qdrant_service.upsert_batch, ids, batch_vectors, batch_payloads
+                ))
+                offset += rows
+
+            for future in in_flight:
+                future.result()
+
+        if offset != count:
+            raise RuntimeError(f"Payload file has {offset} rows but manifest declares {count}")
+
+        del vectors
+        return TransferReport(count, dimension, dtype, time.perf_counter() - start)
+
+
+# Global instance
+transfer_service = TransferService()
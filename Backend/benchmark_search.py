@@ -0,0 +1,120 @@
+"""
+Search Benchmark Script
+Measures recall@k and latency of quantized search against exact search
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+
+
+def sample_queries(num_queries: int) -> list[tuple]:
+    """Use stored points from the collection as (id, vector) queries"""
+    points, _ = qdrant_service.client.scroll(
+        collection_name=qdrant_service.collection_name,
+        limit=num_queries,
+        with_vectors=True,
+        with_payload=False
+    )
+    return [(point.id, point.vector) for point in points]
+
+
+def timed_search(query: tuple, k: int, **kwargs) -> tuple[list, float]:
+    """
+    Run a single search and return result ids with latency in ms
+
+    The query point is stored in the collection and would always match
+    itself, so k + 1 results are fetched and the self match is dropped.
+    """
+    query_id, vector = query
+    start = time.perf_counter()
+    points = qdrant_service.search(vector, limit=k + 1, **kwargs)
+    elapsed = (time.perf_counter() - start) * 1000
+    ids = [point.id for point in points if point.id != query_id]
+    return ids[:k], elapsed
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(queries: list[tuple], k: int, oversampling: float, rescore: bool, ground_truth: list[set]) -> dict:
+    """Benchmark one quantized search configuration"""
+    recalls = []
+    latencies = []
+
+    for query, expected in zip(queries, ground_truth):
+        ids, elapsed = timed_search(query, k, oversampling=oversampling, rescore=rescore)
+        latencies.append(elapsed)
+        recalls.append(len(expected.intersection(ids)) / max(len(expected), 1))
+
+    return {
+        "recall": statistics.mean(recalls),
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized search recall and latency")
+    parser.add_argument("--queries", type=int, default=100, help="Number of query vectors to sample")
+    parser.add_argument("-k", type=int, default=10, help="Number of results per query")
+    parser.add_argument(
+        "--oversampling",
+        type=float,
+        nargs="+",
+        default=[1.0, 2.0, 4.0],
+        help="Oversampling factors to evaluate"
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Search Benchmark")
+    print("=" * 60)
+    print(f"Collection:   {settings.qdrant_collection}")
+    print(f"Quantization: {settings.qdrant_quantization}")
+
+    try:
+        qdrant_service.connect(max_retries=1)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    queries = sample_queries(args.queries)
+    if not queries:
+        print("✗ Collection is empty, nothing to benchmark")
+        sys.exit(1)
+
+    print(f"Queries:      {len(queries)}")
+    print(f"k:            {args.k}")
+
+    # Exact search provides the ground truth for recall
+    ground_truth = []
+    exact_latencies = []
+    for query in queries:
+        ids, elapsed = timed_search(query, args.k, exact=True)
+        ground_truth.append(set(ids))
+        exact_latencies.append(elapsed)
+
+    print("\n" + "-" * 60)
+    print(f"{'mode':<24}{'recall@' + str(args.k):>12}{'p50 ms':>12}{'p95 ms':>12}")
+    print("-" * 60)
+    print(f"{'exact':<24}{1.0:>12.4f}{statistics.median(exact_latencies):>12.2f}{percentile(exact_latencies, 95):>12.2f}")
+
+    for rescore in (False, True):
+        for oversampling in args.oversampling:
+            result = run_benchmark(queries, args.k, oversampling, rescore, ground_truth)
+            mode = f"x{oversampling:g} {'rescore' if rescore else 'no rescore'}"
+            print(f"{mode:<24}{result['recall']:>12.4f}{result['p50']:>12.2f}{result['p95']:>12.2f}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Near-Duplicate Job
+Groups near-duplicate images across the whole collection
+
+Group ids are written to the `duplicate_group` payload field, so the
+gallery can list a group with `GET /api/v1/images?duplicate_group=<id>`.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+from app.services.duplicate_service import duplicate_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate image groups")
+    parser.add_argument("--threshold", type=float, default=settings.duplicate_threshold,
+                        help="Minimum cosine similarity to link two images")
+    parser.add_argument("-k", type=int, default=settings.duplicate_neighbors,
+                        help="Nearest neighbours considered per image")
+    parser.add_argument("--block-size", type=int, default=settings.duplicate_block_size,
+                        help="Rows per similarity block (peak memory ~ block_size^2 * 12 bytes)")
+    parser.add_argument("--page-size", type=int, default=settings.duplicate_page_size,
+                        help="Points per Qdrant scroll page")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Directory for the temporary vector file (needs ~4 bytes * dim per image)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Near-Duplicate Job")
+    print("=" * 60)
+    print(f"Collection: {settings.qdrant_collection}")
+    print(f"Threshold:  {args.threshold}")
+    print(f"k:          {args.k}")
+
+    try:
+        qdrant_service.connect(max_retries=1)
+        qdrant_service.create_payload_indexes()
+        report = duplicate_service.find_groups(
+            threshold=args.threshold,
+            k=args.k,
+            block_size=args.block_size,
+            page_size=args.page_size,
+            work_dir=args.work_dir
+        )
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Images:     {report.points}")
+    print(f"Groups:     {report.groups}")
+    print(f"Duplicates: {report.duplicates}")
+    print(f"Elapsed:    {report.elapsed:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Storage Migration Script
+Converts the flat upload directory into the content-addressed sharded layout
+
+Each `Images/<filename>` is recorded in the storage index and moved to
+`Images/ab/cd/<hash>.<ext>`. The migration is idempotent and safe to re-run
+after an interruption.
+"""
+import argparse
+import mimetypes
+import os
+import sys
+from datetime import datetime, timezone
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+from app.services.storage_service import storage_service, StoredFile, hash_content
+
+
+def find_flat_files():
+    """Yield image files stored directly in the upload directory"""
+    for file_path in settings.upload_path.iterdir():
+        if file_path.is_file() and file_path.suffix.lower().lstrip('.') in settings.allowed_extensions_list:
+            yield file_path
+
+
+def migrate_file(file_path, dry_run: bool) -> StoredFile:
+    """Record a flat file in the index and move it to its sharded key"""
+    content = file_path.read_bytes()
+    content_hash = hash_content(content)
+
+    stored = storage_service.get(file_path.name)
+    if stored is None:
+        stored = StoredFile(
+            filename=file_path.name,
+            content_hash=content_hash,
+            extension=file_path.suffix.lower().lstrip('.'),
+            size=len(content),
+            mime_type=mimetypes.guess_type(file_path.name)[0] or "image/jpeg",
+            uploaded_at=datetime.fromtimestamp(file_path.stat().st_mtime, tz=timezone.utc).isoformat()
+        )
+        if dry_run:
+            return stored
+        storage_service.put(stored)
+    elif stored.content_hash != content_hash:
+        raise RuntimeError(f"'{file_path.name}' is already indexed with different content")
+
+    if dry_run:
+        return stored
+
+    # Index first, then move, so an interrupted run leaves the flat file in place
+    target = storage_service.local_path(stored)
+    if target is None:
+        if not storage_service.backend.exists(stored.key):
+            storage_service.backend.save(stored.key, content)
+        file_path.unlink()
+    elif target.exists():
+        # Identical content is already stored under this hash
+        file_path.unlink()
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(file_path, target)
+
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate flat image storage to the sharded layout")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be migrated without changes")
+    parser.add_argument("--update-qdrant", action="store_true", help="Rewrite file_path payloads in Qdrant")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Storage Migration")
+    print("=" * 60)
+    print(f"Upload directory: {settings.upload_path}")
+    print(f"Storage backend:  {settings.storage_backend}")
+
+    storage_service.initialize()
+
+    if args.update_qdrant and not args.dry_run:
+        try:
+            qdrant_service.connect(max_retries=1)
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+    migrated = 0
+    failed = 0
+
+    for file_path in find_flat_files():
+        try:
+            stored = migrate_file(file_path, args.dry_run)
+            print(f"{'Would move' if args.dry_run else '✓ Moved'} {file_path.name} → {stored.key}")
+            migrated += 1
+        except Exception as e:
+            print(f"✗ {file_path.name}: {e}")
+            failed += 1
+            continue
+
+        if args.update_qdrant and not args.dry_run:
+            try:
+                qdrant_service.update_payload(
+                    stored.filename,
+                    {"file_path": stored.key, "content_hash": stored.content_hash}
+                )
+            except RuntimeError as e:
+                print(f"  ✗ Failed to update Qdrant payload: {e}")
+
+    print("=" * 60)
+    print(f"Migrated: {migrated}")
+    print(f"Failed:   {failed}")
+    print("=" * 60)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
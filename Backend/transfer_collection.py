@@ -0,0 +1,63 @@
+"""
+Collection Transfer Script
+Exports and imports the vector collection without re-embedding images
+
+Usage:
+    python transfer_collection.py export ./backup --dtype float16
+    python transfer_collection.py import ./backup --parallel 8
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from app.config.settings import settings
+from app.services.qdrant_service import qdrant_service
+from app.services.transfer_service import transfer_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import the vector collection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export vectors and payloads to a directory")
+    export_parser.add_argument("directory", type=Path)
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                               help="Vector storage type (float16 halves file size)")
+    export_parser.add_argument("--page-size", type=int, default=settings.transfer_batch_size,
+                               help="Points per Qdrant scroll page")
+
+    import_parser = subparsers.add_parser("import", help="Import vectors and payloads from a directory")
+    import_parser.add_argument("directory", type=Path)
+    import_parser.add_argument("--batch-size", type=int, default=settings.transfer_batch_size,
+                               help="Points per upsert request")
+    import_parser.add_argument("--parallel", type=int, default=settings.transfer_parallel,
+                               help="Concurrent upsert requests")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Collection {args.command.capitalize()}")
+    print("=" * 60)
+    print(f"Collection: {settings.qdrant_collection}")
+    print(f"Directory:  {args.directory}")
+
+    try:
+        qdrant_service.connect(max_retries=1)
+
+        if args.command == "export":
+            report = transfer_service.export_collection(args.directory, args.dtype, args.page_size)
+        else:
+            report = transfer_service.import_collection(args.directory, args.batch_size, args.parallel)
+    except (RuntimeError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Points:     {report.points}")
+    print(f"Dimension:  {report.dimension} ({report.dtype})")
+    print(f"Elapsed:    {report.elapsed:.1f}s ({report.points_per_second:.0f} points/s)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()